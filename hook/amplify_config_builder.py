@@ -1,7 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from hook.assumed_role import CREDENTIAL_CACHE
 from hook.model.amplify_config import *
 
 from sceptre.connection_manager import ConnectionManager
 
+USER_POOL_RESOURCE_TYPE = "cognito-idp:userpool"
+
+IDENTITY_POOL_RESOURCE_TYPE = "cognito-identity:identitypool"
+
+MAX_WORKERS = 8
+
+PASSWORD_CHARACTER_REQUIREMENTS = {
+    "RequireLowercase": "REQUIRES_LOWERCASE",
+    "RequireUppercase": "REQUIRES_UPPERCASE",
+    "RequireNumbers": "REQUIRES_NUMBERS",
+    "RequireSymbols": "REQUIRES_SYMBOLS",
+}
+
+# NB: Amplify lists SMS when MFA is off.
+DEFAULT_MFA_TYPES = ["SMS"]
+
+
+def attribute_names(names):
+    return [name.upper() for name in names]
+
+
+def mfa_types(user_pool):
+    """
+    Return the MFA factors of a user pool.
+
+    Without an SMS configuration a software token is the only factor MFA can use. With
+    one, SMS is assumed; whether TOTP is also enabled needs get_user_pool_mfa_config.
+    """
+    if user_pool.get("MfaConfiguration", "OFF") == "OFF":
+        return list(DEFAULT_MFA_TYPES)
+    if "SmsConfiguration" not in user_pool:
+        return ["TOTP"]
+    return ["SMS"]
+
+
+def signup_attributes(user_pool):
+    return attribute_names(
+        attribute["Name"]
+        for attribute in user_pool.get("SchemaAttributes", [])
+        if attribute.get("Required") and attribute["Name"] != "sub"
+    )
+
+
+# Fields of the Amplify auth configuration derived from the describe_user_pool response.
+# Each field maps to a function of the user pool description (or of its password policy).
+USER_POOL_MAPPINGS = {
+    "usernameAttributes": lambda up: attribute_names(up.get("UsernameAttributes", [])),
+    "signupAttributes": signup_attributes,
+    "mfaConfiguration": lambda up: up.get("MfaConfiguration", "OFF"),
+    "mfaTypes": mfa_types,
+    "verificationMechanisms": lambda up: attribute_names(
+        up.get("AutoVerifiedAttributes", [])
+    ),
+}
+
+PASSWORD_POLICY_MAPPINGS = {
+    "passwordPolicyMinLength": lambda pp: pp.get("MinimumLength", 8),
+    "passwordPolicyCharacters": lambda pp: [
+        character
+        for key, character in PASSWORD_CHARACTER_REQUIREMENTS.items()
+        if pp.get(key)
+    ],
+}
+
+
+def map_fields(mappings, source):
+    return {field: mapping(source) for field, mapping in mappings.items()}
+
 
 class AmplifyConfigBuilder:
     """
@@ -10,22 +81,75 @@ class AmplifyConfigBuilder:
     Precondition: The cognito resources were deployed.
 
     Note: I could not find all the values by querying cognito so some configurations are sensible defaults.
+    The rest of the auth settings are mapped from the describe_user_pool response, see USER_POOL_MAPPINGS.
+
+    Resources are discovered either by name prefix or, when tags are given, with a single
+    Resource Groups Tagging API query that covers both the user pool and the identity pool.
     """
 
+    def fetch_tagged_resources(self):
+        """Return the ARNs of the tagged cognito resources, grouped by resource type."""
+        if self._tagged_resources is not None:
+            return self._tagged_resources
+
+        arns = {USER_POOL_RESOURCE_TYPE: [], IDENTITY_POOL_RESOURCE_TYPE: []}
+        # NB: YAML reads unquoted tag values such as 2 or true as ints and bools.
+        kwargs = {
+            "TagFilters": [
+                {"Key": key, "Values": [str(value)]} for key, value in self.tags.items()
+            ],
+            "ResourceTypeFilters": list(arns),
+        }
+        while True:
+            page = self.cm.call("resourcegroupstaggingapi", "get_resources", kwargs)
+            for mapping in page.get("ResourceTagMappingList", []):
+                # arn:partition:service:region:account:resource-type/resource-id
+                arn = mapping["ResourceARN"]
+                parts = arn.split(":", 5)
+                resource_type = f"{parts[2]}:{parts[5].split('/', 1)[0]}"
+                if resource_type in arns:
+                    arns[resource_type].append(arn)
+
+            token = page.get("PaginationToken")
+            if not token:
+                break
+            kwargs = {**kwargs, "PaginationToken": token}
+
+        self._tagged_resources = arns
+        return arns
+
+    def fetch_tagged_resource_id(self, resource_type):
+        """Return the id of the only tagged resource of a type, taken from its ARN."""
+        arns = self.fetch_tagged_resources()[resource_type]
+        if not arns:
+            raise LookupError(f"No {resource_type} resource is tagged with {self.tags}")
+        # NB: tag:GetResources does not order its results, so refuse to pick one.
+        if len(arns) > 1:
+            raise LookupError(
+                f"{len(arns)} {resource_type} resources are tagged with {self.tags}"
+            )
+        return arns[0].split("/", 1)[1]
+
     def fetch_user_pool(self):
-        """Return a description of the first user that matches a prefix."""
+        """Return a description of the first user that matches a prefix or the tags."""
+        if self.tags:
+            user_pool_id = self.fetch_tagged_resource_id(USER_POOL_RESOURCE_TYPE)
+        else:
+            user_pool_id = self.find_user_pool_id()
+
+        description = self.cm.call(
+            "cognito-idp", "describe_user_pool", {"UserPoolId": user_pool_id}
+        )
+        return description["UserPool"]
+
+    def find_user_pool_id(self):
         listing = self.cm.call("cognito-idp", "list_user_pools", {"MaxResults": 60})
         user_pool = [
             up
             for up in listing.get("UserPools", [])
             if up["Name"].startswith(self.prefix)
         ][0]
-        user_pool_id = user_pool["Id"]
-
-        description = self.cm.call(
-            "cognito-idp", "describe_user_pool", {"UserPoolId": user_pool_id}
-        )
-        return description["UserPool"]
+        return user_pool["Id"]
 
     def fetch_user_pool_client(self, user_pool_id):
         listing = self.cm.call(
@@ -51,7 +175,32 @@ class AmplifyConfigBuilder:
         )
         return domain
 
+    def find_user_pool_domain(self, user_pool):
+        """Return the domain prefix of a user pool, described by tag or by name prefix."""
+        if not self.tags:
+            return self.fetch_user_pool_domain()["DomainDescription"]["Domain"]
+
+        # NB: describe_user_pool already reports the domain, no need to describe it again.
+        if not user_pool.get("Domain"):
+            raise LookupError(f"User pool {user_pool['Id']} has no domain")
+        return user_pool["Domain"]
+
     def fetch_identity_pool(self):
+        if self.tags:
+            identity_pool_id = self.fetch_tagged_resource_id(
+                IDENTITY_POOL_RESOURCE_TYPE
+            )
+        else:
+            identity_pool_id = self.find_identity_pool_id()
+
+        description = self.cm.call(
+            "cognito-identity",
+            "describe_identity_pool",
+            {"IdentityPoolId": identity_pool_id},
+        )
+        return description
+
+    def find_identity_pool_id(self):
         listing = self.cm.call(
             "cognito-identity", "list_identity_pools", {"MaxResults": 60}
         )
@@ -60,27 +209,20 @@ class AmplifyConfigBuilder:
             for idp in listing["IdentityPools"]
             if idp["IdentityPoolName"].startswith(self.prefix)
         ][0]
-        identity_pool_id = identity_pool["IdentityPoolId"]
-
-        description = self.cm.call(
-            "cognito-identity",
-            "describe_identity_pool",
-            {"IdentityPoolId": identity_pool_id},
-        )
-        return description
+        return identity_pool["IdentityPoolId"]
 
     def build(self):
         user_pool = self.fetch_user_pool()
         user_pool_id = user_pool["Id"]
         user_pool_client = self.fetch_user_pool_client(user_pool_id)
-        user_pool_domain = self.fetch_user_pool_domain()
+        domain = self.find_user_pool_domain(user_pool)
         identity_pool = self.fetch_identity_pool()
 
+        password_policy = user_pool.get("Policies", {}).get("PasswordPolicy", {})
         password_settings = PasswordProtectionSettings(
-            passwordPolicyMinLength=8, passwordPolicyCharacters=[]
+            **map_fields(PASSWORD_POLICY_MAPPINGS, password_policy)
         )
 
-        domain = user_pool_domain["DomainDescription"]["Domain"]
         domain = f"{domain}.auth.{self.cm.region}.amazoncognito.com"
         oauth = OAuth(
             WebDomain=domain,
@@ -94,12 +236,8 @@ class AmplifyConfigBuilder:
             OAuth=oauth,
             authenticationFlowType="USER_SRP_AUTH",  # NB: Could not find in API calls.
             socialProviders=[],
-            usernameAttributes=[],
-            signupAttributes=["EMAIL"],  # NB: Could not find in API calls.
             passwordProtectionSettings=password_settings,
-            mfaConfiguration=user_pool["MfaConfiguration"],
-            mfaTypes=["SMS"],  # NB: Could not find in API calls.
-            verificationMechanisms=["EMAIL"],  # NB: Could not find in API calls.
+            **map_fields(USER_POOL_MAPPINGS, user_pool),
         )
 
         auth_class = AuthClass(Default=auth_default)
@@ -141,6 +279,32 @@ class AmplifyConfigBuilder:
 
         return config
 
-    def __init__(self, connection_manager: ConnectionManager, prefix):
+    @classmethod
+    def build_for_targets(
+        cls,
+        connection_manager: ConnectionManager,
+        targets,
+        prefix=None,
+        tags=None,
+        max_workers=MAX_WORKERS,
+        credential_cache=CREDENTIAL_CACHE,
+    ):
+        """
+        Build a configuration in each target account, in parallel.
+
+        The connection_manager supplies the credentials the target roles are assumed from.
+        Returns a dict of configurations keyed on target.
+        """
+
+        def build(target):
+            connection = credential_cache.connection(connection_manager, target)
+            return cls(connection, prefix, tags).build()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return dict(zip(targets, pool.map(build, targets)))
+
+    def __init__(self, connection_manager: ConnectionManager, prefix=None, tags=None):
         self.cm = connection_manager
         self.prefix = prefix
+        self.tags = tags or {}
+        self._tagged_resources = None
@@ -2,16 +2,46 @@ import sceptre.resolvers.stack_attr
 from sceptre.exceptions import InvalidHookArgumentTypeError
 from sceptre.hooks import Hook
 
-from hook.amplify_config_builder import AmplifyConfigBuilder
+from hook.amplify_config_builder import MAX_WORKERS, AmplifyConfigBuilder
+from hook.assumed_role import AccountTarget
 
 PREFIX = "prefix"
 
+TAGS = "tags"
+
+STACK_TAGS = "stack_tags"
+
+STACK_NAME_TAG = "aws:cloudformation:stack-name"
+
 AMPLIFY_CONFIG = "amplify_config"
 
 FORMAT = "format"
 
 AVAILABLE_FORMATS = ["json", "dart"]
 
+TARGETS = "targets"
+
+TARGET_KEYS = {"account_id", "role_name", "region"}
+
+MAX_WORKERS_ARGUMENT = "max_workers"
+
+
+def target_path(amplify_config, target, region):
+    return (
+        str(amplify_config)
+        .replace("{account_id}", target.account_id)
+        .replace("{region}", region)
+    )
+
+
+def write_config(config, amplify_config, format):
+    with open(amplify_config, "w") as f:
+        json_out = config.model_dump_json(indent=4)
+        if format == "dart":
+            f.write(f"const amplifyconfig = '''\n{json_out}\n''';")
+        else:
+            f.write(json_out)
+
 
 class AmplifyConfigGenerateHook(Hook):
     """
@@ -43,7 +73,10 @@ class AmplifyConfigGenerateHook(Hook):
             raise Exception(InvalidHookArgumentTypeError)
 
         prefix = self.argument.get(PREFIX)
-        if not prefix:
+        tags = dict(self.argument.get(TAGS) or {})
+        if self.argument.get(STACK_TAGS):
+            tags[STACK_NAME_TAG] = self.stack.external_name
+        if not prefix and not tags:
             raise Exception(InvalidHookArgumentTypeError)
 
         amplify_config = self.argument.get(AMPLIFY_CONFIG)
@@ -54,19 +87,50 @@ class AmplifyConfigGenerateHook(Hook):
         if format not in AVAILABLE_FORMATS:
             raise Exception(InvalidHookArgumentTypeError)
 
+        targets = self.argument.get(TARGETS, [])
+        if targets and "{account_id}" not in str(amplify_config):
+            raise Exception(InvalidHookArgumentTypeError)
+        for target in targets:
+            if not isinstance(target, dict) or set(target) - TARGET_KEYS:
+                raise Exception(InvalidHookArgumentTypeError)
+            if not target.get("account_id") or not target.get("role_name"):
+                raise Exception(InvalidHookArgumentTypeError)
+        targets = [AccountTarget(**target) for target in targets]
+
+        # NB: Targets in one account but different regions need {region} in the path.
+        region = self.stack.connection_manager.region
+        paths = [
+            target_path(amplify_config, target, target.region or region)
+            for target in targets
+        ]
+        if len(set(paths)) != len(paths):
+            raise Exception(InvalidHookArgumentTypeError)
+
+        max_workers = self.argument.get(MAX_WORKERS_ARGUMENT, MAX_WORKERS)
+        if not isinstance(max_workers, int) or isinstance(max_workers, bool):
+            raise Exception(InvalidHookArgumentTypeError)
+        if max_workers < 1:
+            raise Exception(InvalidHookArgumentTypeError)
+
         if isinstance(prefix, sceptre.resolvers.stack_attr.StackAttr):
             prefix.stack = self.stack
             prefix = prefix.resolve()
 
-        builder = AmplifyConfigBuilder(self.stack.connection_manager, prefix)
+        if targets:
+            configs = AmplifyConfigBuilder.build_for_targets(
+                self.stack.connection_manager,
+                targets,
+                prefix,
+                tags,
+                max_workers=max_workers,
+            )
+            for target, path in zip(targets, paths):
+                write_config(configs[target], path, format)
+            return
+
+        builder = AmplifyConfigBuilder(self.stack.connection_manager, prefix, tags)
         config = builder.build()
-
-        with open(amplify_config, "w") as f:
-            json_out = config.model_dump_json(indent=4)
-            if format == "dart":
-                f.write(f"const amplifyconfig = '''\n{json_out}\n''';")
-            else:
-                f.write(json_out)
+        write_config(config, amplify_config, format)
 
     def __init__(self, *args, **kwargs):
         super(AmplifyConfigGenerateHook, self).__init__(*args, **kwargs)
@@ -0,0 +1,137 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+
+import boto3
+from sceptre.connection_manager import ConnectionManager
+
+ROLE_SESSION_NAME = "sceptre-amplify-config-generate-hook"
+
+# Credentials are refreshed this long before STS says they expire.
+REFRESH_MARGIN = timedelta(minutes=5)
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+@lru_cache(maxsize=None)
+def partition_for_region(region):
+    return boto3.Session().get_partition_for_region(region)
+
+
+@dataclass(frozen=True)
+class AccountTarget:
+    """An account to generate a configuration for and the role to assume in it."""
+
+    account_id: str
+    role_name: str
+    region: Optional[str] = None
+
+    def __post_init__(self):
+        # NB: YAML reads unquoted account ids as ints.
+        object.__setattr__(self, "account_id", str(self.account_id))
+
+    def role_arn(self, partition="aws"):
+        return f"arn:{partition}:iam::{self.account_id}:role/{self.role_name}"
+
+
+class AssumedRoleConnection:
+    """
+    Stands in for a ConnectionManager in a target account.
+
+    Only the parts the AmplifyConfigBuilder uses, `region` and `call`, are implemented.
+    """
+
+    def call(self, service, command, kwargs=None):
+        return getattr(self.client(service), command)(**(kwargs or {}))
+
+    def client(self, service):
+        # NB: boto3 sessions are not thread safe, clients are.
+        with self._lock:
+            if service not in self._clients:
+                self._clients[service] = self.session.client(
+                    service, region_name=self.region
+                )
+            return self._clients[service]
+
+    def __init__(self, credentials, region):
+        self.session = boto3.Session(
+            aws_access_key_id=credentials["AccessKeyId"],
+            aws_secret_access_key=credentials["SecretAccessKey"],
+            aws_session_token=credentials["SessionToken"],
+        )
+        self.region = region
+        self._clients = {}
+        self._lock = threading.Lock()
+
+
+class AssumedRoleCredentialCache:
+    """
+    Caches assumed-role credentials until shortly before they expire.
+
+    Credentials are global, so they are keyed on the source profile and sceptre role and
+    on the target role only. The region specific connections built from them are cached
+    separately and rebuilt whenever the credentials are refreshed. Every stack and every
+    hook run in the process reuses them.
+    """
+
+    def credentials(self, connection_manager: ConnectionManager, role_arn):
+        # NB: sceptre 3 calls the sceptre role iam_role.
+        sceptre_role = getattr(
+            connection_manager,
+            "sceptre_role",
+            getattr(connection_manager, "iam_role", None),
+        )
+        key = (connection_manager.profile, sceptre_role, role_arn)
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # NB: Lock per key so parallel targets assume their roles concurrently, but a
+        # role is only assumed once when several threads want it at the same time.
+        with key_lock:
+            cached = self._credentials.get(key)
+            if cached and cached["Expiration"] - self.refresh_margin > self.clock():
+                return key, cached
+
+            response = connection_manager.call(
+                "sts",
+                "assume_role",
+                {"RoleArn": role_arn, "RoleSessionName": ROLE_SESSION_NAME},
+            )
+            self._credentials[key] = response["Credentials"]
+            return key, response["Credentials"]
+
+    def connection(self, connection_manager: ConnectionManager, target: AccountTarget):
+        region = target.region or connection_manager.region
+        role_arn = target.role_arn(partition_for_region(connection_manager.region))
+        key, credentials = self.credentials(connection_manager, role_arn)
+
+        with self._lock:
+            cached = self._connections.get((key, region))
+            if cached and cached[1] == credentials["AccessKeyId"]:
+                return cached[0]
+
+            connection = AssumedRoleConnection(credentials, region)
+            self._connections[(key, region)] = (connection, credentials["AccessKeyId"])
+            return connection
+
+    def clear(self):
+        with self._lock:
+            self._credentials.clear()
+            self._connections.clear()
+            self._key_locks.clear()
+
+    def __init__(self, refresh_margin=REFRESH_MARGIN, clock=utcnow):
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self._credentials = {}
+        self._connections = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+
+CREDENTIAL_CACHE = AssumedRoleCredentialCache()
@@ -8,7 +8,13 @@ import pytest
 from sceptre.connection_manager import ConnectionManager
 import os
 
-from hook.amplify_config_builder import AmplifyConfigBuilder
+from hook.amplify_config_builder import (
+    PASSWORD_POLICY_MAPPINGS,
+    USER_POOL_MAPPINGS,
+    AmplifyConfigBuilder,
+    map_fields,
+)
+from hook.assumed_role import AccountTarget
 
 
 @mock_cognitoidp
@@ -219,8 +225,271 @@ class TestAmplifyConfigBuilder:
             config = confbuilder.build()
 
         assert config
+        auth_default = config.auth.plugins.awsCognitoAuthPlugin.Auth.Default
+        assert auth_default.passwordProtectionSettings.passwordPolicyMinLength == 8
+        assert auth_default.passwordProtectionSettings.passwordPolicyCharacters == [
+            "REQUIRES_LOWERCASE",
+            "REQUIRES_UPPERCASE",
+            "REQUIRES_NUMBERS",
+            "REQUIRES_SYMBOLS",
+        ]
+        assert auth_default.signupAttributes == ["EMAIL"]
+        assert auth_default.verificationMechanisms == ["EMAIL"]
+        assert auth_default.usernameAttributes == []
+
+        self.teardown_userpool_domain(user_pool_id, domain)
+        self.teardown_userpool_client(user_pool_id, client_id)
+        self.teardown_userpool(user_pool_id)
+        self.teardown_identity_pool(idpool_id)
+
+    def test_fetch_tagged_resources(self):
+        connection = ConnectionManager("us-east-1")
+        tags = {"aws:cloudformation:stack-name": "my-stack"}
+        confbuilder = AmplifyConfigBuilder(connection_manager=connection, tags=tags)
+        user_pool_arn = (
+            "arn:aws:cognito-idp:us-east-1:123456789012:userpool/us-east-1_abc"
+        )
+        identity_pool_arn = (
+            "arn:aws:cognito-identity:us-east-1:123456789012:identitypool/us-east-1:def"
+        )
+        pages = {
+            None: {
+                "ResourceTagMappingList": [{"ResourceARN": user_pool_arn}],
+                "PaginationToken": "next",
+            },
+            "next": {
+                "ResourceTagMappingList": [{"ResourceARN": identity_pool_arn}],
+                "PaginationToken": "",
+            },
+        }
+
+        with mock.patch.object(connection, "call") as mock_method:
+
+            def side_effect(service, command, kwargs):
+                assert service == "resourcegroupstaggingapi"
+                assert command == "get_resources"
+                assert kwargs["TagFilters"] == [
+                    {"Key": "aws:cloudformation:stack-name", "Values": ["my-stack"]}
+                ]
+                return pages[kwargs.get("PaginationToken")]
+
+            mock_method.side_effect = side_effect
+
+            fetched = confbuilder.fetch_tagged_resources()
+            user_pool_id = confbuilder.fetch_tagged_resource_id("cognito-idp:userpool")
+            identity_pool_id = confbuilder.fetch_tagged_resource_id(
+                "cognito-identity:identitypool"
+            )
+
+        assert mock_method.call_count == 2
+        assert fetched["cognito-idp:userpool"] == [user_pool_arn]
+        assert fetched["cognito-identity:identitypool"] == [identity_pool_arn]
+        assert user_pool_id == "us-east-1_abc"
+        assert identity_pool_id == "us-east-1:def"
+
+    def test_fetch_tagged_resource_id_with_several_matches(self):
+        connection = ConnectionManager("us-east-1")
+        confbuilder = AmplifyConfigBuilder(
+            connection_manager=connection, tags={"env": 2, "enabled": True}
+        )
+
+        with mock.patch.object(connection, "call") as mock_method:
+            mock_method.return_value = {
+                "ResourceTagMappingList": [
+                    {
+                        "ResourceARN": "arn:aws:cognito-idp:us-east-1:123456789012:"
+                        f"userpool/us-east-1_{suffix}"
+                    }
+                    for suffix in ("abc", "def")
+                ]
+            }
+
+            with pytest.raises(LookupError):
+                confbuilder.fetch_tagged_resource_id("cognito-idp:userpool")
+
+        _, _, kwargs = mock_method.call_args.args
+        assert kwargs["TagFilters"] == [
+            {"Key": "env", "Values": ["2"]},
+            {"Key": "enabled", "Values": ["True"]},
+        ]
+
+    def test_build_with_tags(self):
+        user_pool_id = self.bootstrap_userpool()
+        client_id = self.bootstrap_userpool_client(user_pool_id)
+        domain = self.bootstrap_userpool_domain(user_pool_id)
+        idpool_id = self.bootstrap_identity_pool()
+
+        connection = ConnectionManager("us-east-1")
+        unpatched_call = connection.call
+        confbuilder = AmplifyConfigBuilder(
+            connection_manager=connection, tags={"app": "my-app"}
+        )
+
+        with mock.patch.object(connection, "call") as mock_method:
+
+            def side_effect(service, command, kwargs):
+                if service == "resourcegroupstaggingapi" and command == "get_resources":
+                    return {
+                        "ResourceTagMappingList": [
+                            {
+                                "ResourceARN": "arn:aws:cognito-idp:us-east-1:123456789012:"
+                                f"userpool/{user_pool_id}"
+                            },
+                            {
+                                "ResourceARN": "arn:aws:cognito-identity:us-east-1:123456789012:"
+                                f"identitypool/{idpool_id}"
+                            },
+                        ]
+                    }
+                assert command not in (
+                    "list_user_pools",
+                    "list_identity_pools",
+                    "describe_user_pool_domain",
+                )
+                return unpatched_call(service, command, kwargs)
+
+            mock_method.side_effect = side_effect
+
+            config = confbuilder.build()
+
+        default = config.auth.plugins.awsCognitoAuthPlugin
+        assert default.CognitoUserPool.Default.PoolId == user_pool_id
+        assert default.CredentialsProvider.CognitoIdentity.Default.PoolId == idpool_id
+
+        self.teardown_userpool_domain(user_pool_id, domain)
+        self.teardown_userpool_client(user_pool_id, client_id)
+        self.teardown_userpool(user_pool_id)
+        self.teardown_identity_pool(idpool_id)
+
+    def test_build_with_tags_without_domain(self):
+        connection = ConnectionManager("us-east-1")
+        confbuilder = AmplifyConfigBuilder(
+            connection_manager=connection, tags={"app": "my-app"}
+        )
+
+        with mock.patch.object(connection, "call") as mock_method:
+
+            def side_effect(service, command, kwargs):
+                if command == "get_resources":
+                    return {
+                        "ResourceTagMappingList": [
+                            {
+                                "ResourceARN": "arn:aws:cognito-idp:us-east-1:123456789012:"
+                                "userpool/us-east-1_abc"
+                            },
+                        ]
+                    }
+                if command == "describe_user_pool":
+                    return {"UserPool": {"Id": "us-east-1_abc"}}
+                if command == "list_user_pool_clients":
+                    return {"UserPoolClients": [{"ClientId": "client"}]}
+                if command == "describe_user_pool_client":
+                    return {"UserPoolClient": {"ClientId": "client"}}
+                raise AssertionError(f"Unexpected call {service} {command}")
+
+            mock_method.side_effect = side_effect
+
+            with pytest.raises(LookupError):
+                confbuilder.build()
+
+    def test_build_for_targets(self):
+        user_pool_id = self.bootstrap_userpool()
+        client_id = self.bootstrap_userpool_client(user_pool_id)
+        domain = self.bootstrap_userpool_domain(user_pool_id)
+        idpool_id = self.bootstrap_identity_pool()
+
+        connection = ConnectionManager("us-east-1")
+        unpatched_call = connection.call
+        credential_cache = mock.Mock()
+        credential_cache.connection.return_value = connection
+        targets = [
+            AccountTarget(account_id="123456789012", role_name="Deployer"),
+            AccountTarget(account_id="210987654321", role_name="Deployer"),
+        ]
+
+        with mock.patch.object(connection, "call") as mock_method:
+
+            def side_effect(service, command, kwargs):
+                if service == "cognito-identity" and command == "list_identity_pools":
+                    return {
+                        "IdentityPools": [
+                            {
+                                "IdentityPoolId": idpool_id,
+                                "IdentityPoolName": "MyIdentityPool",
+                            },
+                        ]
+                    }
+                return unpatched_call(service, command, kwargs)
+
+            mock_method.side_effect = side_effect
+
+            configs = AmplifyConfigBuilder.build_for_targets(
+                connection,
+                targets,
+                prefix="My",
+                max_workers=2,
+                credential_cache=credential_cache,
+            )
+
+        assert list(configs) == targets
+        assert credential_cache.connection.call_count == 2
+        credential_cache.connection.assert_any_call(connection, targets[1])
 
         self.teardown_userpool_domain(user_pool_id, domain)
         self.teardown_userpool_client(user_pool_id, client_id)
         self.teardown_userpool(user_pool_id)
         self.teardown_identity_pool(idpool_id)
+
+    def test_map_fields(self):
+        user_pool = {
+            "Policies": {
+                "PasswordPolicy": {
+                    "MinimumLength": 12,
+                    "RequireUppercase": True,
+                    "RequireLowercase": False,
+                    "RequireNumbers": True,
+                    "RequireSymbols": False,
+                }
+            },
+            "SchemaAttributes": [
+                {"Name": "sub", "Required": True},
+                {"Name": "email", "Required": True},
+                {"Name": "phone_number", "Required": True},
+                {"Name": "name", "Required": False},
+            ],
+            "UsernameAttributes": ["email"],
+            "AutoVerifiedAttributes": ["phone_number"],
+            "MfaConfiguration": "OPTIONAL",
+            "SmsConfiguration": {"SnsCallerArn": "arn:aws:iam::123456789012:role/sns"},
+        }
+
+        mapped = map_fields(USER_POOL_MAPPINGS, user_pool)
+        password = map_fields(
+            PASSWORD_POLICY_MAPPINGS, user_pool["Policies"]["PasswordPolicy"]
+        )
+
+        assert mapped == {
+            "usernameAttributes": ["EMAIL"],
+            "signupAttributes": ["EMAIL", "PHONE_NUMBER"],
+            "mfaConfiguration": "OPTIONAL",
+            "mfaTypes": ["SMS"],
+            "verificationMechanisms": ["PHONE_NUMBER"],
+        }
+        assert password == {
+            "passwordPolicyMinLength": 12,
+            "passwordPolicyCharacters": ["REQUIRES_UPPERCASE", "REQUIRES_NUMBERS"],
+        }
+
+    def test_map_mfa_types(self):
+        sms = {"SnsCallerArn": "arn:aws:iam::123456789012:role/sns"}
+
+        def mfa_types(user_pool):
+            return map_fields(USER_POOL_MAPPINGS, user_pool)["mfaTypes"]
+
+        assert mfa_types({"MfaConfiguration": "OFF"}) == ["SMS"]
+        assert mfa_types({"MfaConfiguration": "OFF", "SmsConfiguration": sms}) == [
+            "SMS"
+        ]
+        assert mfa_types({"MfaConfiguration": "ON"}) == ["TOTP"]
+        assert mfa_types({"MfaConfiguration": "OPTIONAL"}) == ["TOTP"]
+        assert mfa_types({"MfaConfiguration": "ON", "SmsConfiguration": sms}) == ["SMS"]
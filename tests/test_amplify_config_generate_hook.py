@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from dataclasses import dataclass
-from moto import mock_cognitoidp, mock_cognitoidentity
+from moto import mock_cognitoidp, mock_cognitoidentity, mock_sts
 from unittest import TestCase, mock
 from pathlib import Path
 
@@ -13,10 +13,12 @@ import os
 
 # from hook.amplify_config_builder import AmplifyConfigBuilder
 import hook.amplify_config_generate_hook as amplifyhook
+from hook.assumed_role import CREDENTIAL_CACHE
 
 
 @mock_cognitoidp
 @mock_cognitoidentity
+@mock_sts
 class TestAmplifyConfigGenerateHook:
     def bootstrap_environment(self):
         """Mocked AWS Credentials for moto."""
@@ -165,6 +167,201 @@ class TestAmplifyConfigGenerateHook:
         self.teardown_userpool(user_pool_id)
         self.teardown_identity_pool(idpool_id)
 
+    def run_hook(self, tmp_path, argument):
+        h = amplifyhook.AmplifyConfigGenerateHook(
+            argument={amplifyhook.AMPLIFY_CONFIG: tmp_path / "test.json", **argument},
+        )
+        h.stack = MockStack(connection_manager=ConnectionManager("us-east-1"))
+
+        with mock.patch.object(amplifyhook, "AmplifyConfigBuilder") as mock_builder:
+            config = mock_builder.return_value.build.return_value
+            config.model_dump_json.return_value = "{}"
+            h.run()
+
+        return mock_builder
+
+    def test_run_with_tags(self, tmp_path):
+        mock_builder = self.run_hook(tmp_path, {amplifyhook.TAGS: {"app": "my-app"}})
+
+        _, prefix, tags = mock_builder.call_args.args
+        assert prefix is None
+        assert tags == {"app": "my-app"}
+        assert (tmp_path / "test.json").read_text() == "{}"
+
+    def test_run_with_stack_tags(self, tmp_path):
+        mock_builder = self.run_hook(
+            tmp_path,
+            {amplifyhook.TAGS: {"app": "my-app"}, amplifyhook.STACK_TAGS: True},
+        )
+
+        _, _, tags = mock_builder.call_args.args
+        assert tags == {"app": "my-app", "aws:cloudformation:stack-name": "my-stack"}
+
+    def test_run_without_prefix_or_tags(self, tmp_path):
+        with pytest.raises(Exception):
+            self.run_hook(tmp_path, {})
+
+    def test_run_with_targets(self, tmp_path):
+        self.bootstrap_environment()
+        CREDENTIAL_CACHE.clear()
+        h = amplifyhook.AmplifyConfigGenerateHook(
+            argument={
+                amplifyhook.AMPLIFY_CONFIG: str(tmp_path / "{account_id}.json"),
+                amplifyhook.PREFIX: "My",
+                amplifyhook.TARGETS: [
+                    {"account_id": 111111111111, "role_name": "Deployer"},
+                    {"account_id": "222222222222", "role_name": "Deployer"},
+                ],
+            },
+        )
+        h.stack = MockStack(connection_manager=ConnectionManager("us-east-1"))
+
+        def build(builder):
+            config = mock.Mock()
+            identity = builder.cm.call("sts", "get_caller_identity")
+            config.model_dump_json.return_value = identity["Arn"]
+            return config
+
+        with mock.patch.object(
+            amplifyhook.AmplifyConfigBuilder, "build", autospec=True, side_effect=build
+        ):
+            h.run()
+
+        for account_id in ("111111111111", "222222222222"):
+            written = (tmp_path / f"{account_id}.json").read_text()
+            assert f"::{account_id}:assumed-role/Deployer/" in written
+
+    def test_run_with_max_workers(self, tmp_path):
+        mock_build = self.run_targets_hook(
+            tmp_path,
+            "{account_id}.json",
+            {
+                amplifyhook.TARGETS: [
+                    {"account_id": "111111111111", "role_name": "Deployer"}
+                ],
+                amplifyhook.MAX_WORKERS_ARGUMENT: 2,
+            },
+        )
+
+        assert mock_build.call_args.kwargs["max_workers"] == 2
+
+    def test_run_with_targets_without_account_id_placeholder(self, tmp_path):
+        with pytest.raises(Exception):
+            self.run_hook(
+                tmp_path,
+                {
+                    amplifyhook.PREFIX: "My",
+                    amplifyhook.TARGETS: [
+                        {"account_id": "111111111111", "role_name": "Deployer"}
+                    ],
+                },
+            )
+
+    def test_run_with_incomplete_target(self, tmp_path):
+        h = amplifyhook.AmplifyConfigGenerateHook(
+            argument={
+                amplifyhook.AMPLIFY_CONFIG: str(tmp_path / "{account_id}.json"),
+                amplifyhook.PREFIX: "My",
+                amplifyhook.TARGETS: [{"account_id": "111111111111"}],
+            },
+        )
+        h.stack = MockStack(connection_manager=ConnectionManager("us-east-1"))
+
+        with pytest.raises(Exception):
+            h.run()
+
+
+    def run_targets_hook(self, tmp_path, amplify_config, argument):
+        h = amplifyhook.AmplifyConfigGenerateHook(
+            argument={
+                amplifyhook.AMPLIFY_CONFIG: str(tmp_path / amplify_config),
+                amplifyhook.PREFIX: "My",
+                **argument,
+            },
+        )
+        h.stack = MockStack(connection_manager=ConnectionManager("us-east-1"))
+
+        with mock.patch.object(
+            amplifyhook.AmplifyConfigBuilder, "build_for_targets"
+        ) as mock_build:
+            mock_build.side_effect = lambda cm, targets, *args, **kwargs: {
+                target: mock.Mock(
+                    **{"model_dump_json.return_value": target.region or "default"}
+                )
+                for target in targets
+            }
+            h.run()
+
+        return mock_build
+
+    def test_run_with_targets_in_several_regions(self, tmp_path):
+        self.run_targets_hook(
+            tmp_path,
+            "{account_id}-{region}.json",
+            {
+                amplifyhook.TARGETS: [
+                    {"account_id": "111111111111", "role_name": "Deployer"},
+                    {
+                        "account_id": "111111111111",
+                        "role_name": "Deployer",
+                        "region": "eu-west-1",
+                    },
+                ],
+            },
+        )
+
+        assert (tmp_path / "111111111111-us-east-1.json").read_text() == "default"
+        assert (tmp_path / "111111111111-eu-west-1.json").read_text() == "eu-west-1"
+
+    def test_run_with_targets_writing_the_same_path(self, tmp_path):
+        with pytest.raises(Exception):
+            self.run_targets_hook(
+                tmp_path,
+                "{account_id}.json",
+                {
+                    amplifyhook.TARGETS: [
+                        {"account_id": "111111111111", "role_name": "Deployer"},
+                        {
+                            "account_id": "111111111111",
+                            "role_name": "Deployer",
+                            "region": "eu-west-1",
+                        },
+                    ],
+                },
+            )
+
+    def test_run_with_unknown_target_key(self, tmp_path):
+        with pytest.raises(Exception):
+            self.run_targets_hook(
+                tmp_path,
+                "{account_id}.json",
+                {
+                    amplifyhook.TARGETS: [
+                        {
+                            "account_id": "111111111111",
+                            "role_name": "Deployer",
+                            "regoin": "eu-west-1",
+                        }
+                    ],
+                },
+            )
+
+    @pytest.mark.parametrize("max_workers", [0, -1, "2", True])
+    def test_run_with_invalid_max_workers(self, tmp_path, max_workers):
+        with pytest.raises(Exception):
+            self.run_targets_hook(
+                tmp_path,
+                "{account_id}.json",
+                {
+                    amplifyhook.TARGETS: [
+                        {"account_id": "111111111111", "role_name": "Deployer"}
+                    ],
+                    amplifyhook.MAX_WORKERS_ARGUMENT: max_workers,
+                },
+            )
+
+
 @dataclass
-class MockStack: 
-    connection_manager: ConnectionManager
\ No newline at end of file
+class MockStack:
+    connection_manager: ConnectionManager
+    external_name: str = "my-stack"
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+from moto import mock_sts
+from unittest import mock
+
+import os
+from sceptre.connection_manager import ConnectionManager
+
+from hook.assumed_role import (
+    AccountTarget,
+    AssumedRoleConnection,
+    AssumedRoleCredentialCache,
+    utcnow,
+)
+
+
+@mock_sts
+class TestAssumedRoleCredentialCache:
+    def bootstrap_environment(self):
+        """Mocked AWS Credentials for moto."""
+        os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+        os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+        os.environ["AWS_SECURITY_TOKEN"] = "testing"
+        os.environ["AWS_SESSION_TOKEN"] = "testing"
+        os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+    def test_role_arn(self):
+        target = AccountTarget(account_id="123456789012", role_name="Deployer")
+        assert target.role_arn() == "arn:aws:iam::123456789012:role/Deployer"
+        assert (
+            target.role_arn("aws-us-gov")
+            == "arn:aws-us-gov:iam::123456789012:role/Deployer"
+        )
+
+    def test_account_id_is_str(self):
+        target = AccountTarget(account_id=123456789012, role_name="Deployer")
+        assert target.account_id == "123456789012"
+
+    def test_connection_uses_source_partition(self):
+        connection = ConnectionManager("us-gov-west-1")
+        cache = AssumedRoleCredentialCache()
+        target = AccountTarget(account_id="123456789012", role_name="Deployer")
+
+        with mock.patch.object(connection, "call") as mock_method:
+            mock_method.return_value = {
+                "Credentials": {
+                    "AccessKeyId": "testing",
+                    "SecretAccessKey": "testing",
+                    "SessionToken": "testing",
+                    "Expiration": utcnow() + timedelta(hours=1),
+                }
+            }
+            cache.connection(connection, target)
+
+        _, _, kwargs = mock_method.call_args.args
+        assert kwargs["RoleArn"] == "arn:aws-us-gov:iam::123456789012:role/Deployer"
+
+    def test_connection(self):
+        self.bootstrap_environment()
+        connection = ConnectionManager("us-east-1")
+        cache = AssumedRoleCredentialCache()
+        target = AccountTarget(account_id="123456789012", role_name="Deployer")
+
+        assumed = cache.connection(connection, target)
+
+        assert isinstance(assumed, AssumedRoleConnection)
+        assert assumed.region == "us-east-1"
+        identity = assumed.call("sts", "get_caller_identity")
+        assert identity["Account"] == "123456789012"
+
+    def test_connection_is_cached(self):
+        self.bootstrap_environment()
+        connection = ConnectionManager("us-east-1")
+        unpatched_call = connection.call
+        cache = AssumedRoleCredentialCache()
+        target = AccountTarget(account_id="123456789012", role_name="Deployer")
+        other = AccountTarget(
+            account_id="210987654321", role_name="Deployer", region="eu-west-1"
+        )
+
+        with mock.patch.object(connection, "call") as mock_method:
+            mock_method.side_effect = unpatched_call
+
+            first = cache.connection(connection, target)
+            second = cache.connection(connection, target)
+            third = cache.connection(connection, other)
+
+        assert first is second
+        assert third is not first
+        assert third.region == "eu-west-1"
+        assert mock_method.call_count == 2
+
+    def test_credentials_are_shared_across_regions(self):
+        self.bootstrap_environment()
+        connection = ConnectionManager("us-east-1")
+        unpatched_call = connection.call
+        cache = AssumedRoleCredentialCache()
+        target = AccountTarget(account_id="123456789012", role_name="Deployer")
+        other_region = AccountTarget(
+            account_id="123456789012", role_name="Deployer", region="eu-west-1"
+        )
+
+        with mock.patch.object(connection, "call") as mock_method:
+            mock_method.side_effect = unpatched_call
+
+            first = cache.connection(connection, target)
+            second = cache.connection(connection, other_region)
+
+        assert first is not second
+        assert second.region == "eu-west-1"
+        assert mock_method.call_count == 1
+
+    def test_credentials_are_keyed_on_sceptre_role(self):
+        self.bootstrap_environment()
+        connection = ConnectionManager("us-east-1")
+        other_connection = ConnectionManager(
+            "us-east-1", sceptre_role="arn:aws:iam::123456789012:role/Other"
+        )
+        cache = AssumedRoleCredentialCache()
+        target = AccountTarget(account_id="123456789012", role_name="Deployer")
+        credentials = {
+            "Credentials": {
+                "AccessKeyId": "testing",
+                "SecretAccessKey": "testing",
+                "SessionToken": "testing",
+                "Expiration": utcnow() + timedelta(hours=1),
+            }
+        }
+
+        with mock.patch.object(
+            connection, "call", return_value=credentials
+        ) as mock_method, mock.patch.object(
+            other_connection, "call", return_value=credentials
+        ) as other_mock_method:
+            first = cache.connection(connection, target)
+            second = cache.connection(other_connection, target)
+
+        assert first is not second
+        assert mock_method.call_count == 1
+        assert other_mock_method.call_count == 1
+
+    def test_connection_is_refreshed_before_expiry(self):
+        self.bootstrap_environment()
+        connection = ConnectionManager("us-east-1")
+        now = utcnow()
+        clock = mock.Mock(return_value=now)
+        cache = AssumedRoleCredentialCache(
+            refresh_margin=timedelta(minutes=5), clock=clock
+        )
+        target = AccountTarget(account_id="123456789012", role_name="Deployer")
+
+        with mock.patch.object(connection, "call") as mock_method:
+
+            def side_effect(service, command, kwargs):
+                return {
+                    "Credentials": {
+                        "AccessKeyId": f"testing{mock_method.call_count}",
+                        "SecretAccessKey": "testing",
+                        "SessionToken": "testing",
+                        "Expiration": clock() + timedelta(minutes=10),
+                    }
+                }
+
+            mock_method.side_effect = side_effect
+
+            first = cache.connection(connection, target)
+            clock.return_value = now + timedelta(minutes=4)
+            second = cache.connection(connection, target)
+            clock.return_value = now + timedelta(minutes=6)
+            third = cache.connection(connection, target)
+
+        assert first is second
+        assert third is not first
+        assert mock_method.call_count == 2
+
+    def test_credentials_are_keyed_on_iam_role(self):
+        # NB: sceptre 3 connection managers have iam_role instead of sceptre_role.
+        connection = mock.Mock(spec=["profile", "iam_role", "region", "call"])
+        connection.profile = None
+        connection.iam_role = "arn:aws:iam::123456789012:role/Other"
+        connection.region = "us-east-1"
+        connection.call.return_value = {
+            "Credentials": {
+                "AccessKeyId": "testing",
+                "SecretAccessKey": "testing",
+                "SessionToken": "testing",
+                "Expiration": utcnow() + timedelta(hours=1),
+            }
+        }
+        cache = AssumedRoleCredentialCache()
+
+        key, _ = cache.credentials(
+            connection, "arn:aws:iam::123456789012:role/Deployer"
+        )
+
+        assert key == (
+            None,
+            "arn:aws:iam::123456789012:role/Other",
+            "arn:aws:iam::123456789012:role/Deployer",
+        )